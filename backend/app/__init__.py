@@ -2,18 +2,31 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager      # Importa JWTManager
 from .config import Config
+from .json_provider import get_json_provider_class
+from . import compression
+from . import routing
+from .routing import RoutingSession
+from .suggest import suggest_index
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()     # Crea la instancia JWTManager
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+    app.json = get_json_provider_class(app.config['JSON_PROVIDER'])(app)
 
     db.init_app(app)
     jwt.init_app(app)  # ¡ESTA LÍNEA ES CRUCIAL!
+    compression.init_app(app)
+    routing.init_app(app, db)
 
     from .routes import main
     app.register_blueprint(main)
 
+    from . import archive
+    archive.init_app(app)
+
+    suggest_index.init_app(app)
+
     return app
@@ -0,0 +1,312 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import click
+import pandas as pd
+from flask import current_app
+
+from . import db
+from .models import Order, OrderDetail
+
+ORDER_COLUMNS = ['id', 'client_id', 'seller_id', 'date', 'total']
+DETAIL_COLUMNS = ['id', 'order_id', 'product_id', 'quantity', 'unit_price']
+
+_manifest_lock = threading.Lock()
+
+
+# ======= MANIFIESTO =======
+def _archive_dir():
+    return current_app.config['ARCHIVE_DIR']
+
+
+def _manifest_path():
+    return os.path.join(_archive_dir(), 'manifest.json')
+
+
+def load_manifest():
+    path = _manifest_path()
+    if not os.path.exists(path):
+        return {'files': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest):
+    # Escritura atómica: nunca queda un manifiesto a medio escribir
+    os.makedirs(_archive_dir(), exist_ok=True)
+    path = _manifest_path()
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ======= ARCHIVADO =======
+def _write_partitions(table, df, months, batch):
+    order_key = 'id' if table == 'order' else 'order_id'
+    entries = []
+    for month, part in df.groupby(months):
+        folder = os.path.join(_archive_dir(), table, f'month={month}')
+        os.makedirs(folder, exist_ok=True)
+        filename = f'part-{batch}.parquet'
+        part.to_parquet(os.path.join(folder, filename), index=False,
+                        compression=current_app.config['ARCHIVE_COMPRESSION'])
+        entry = {
+            'table': table,
+            'month': month,
+            'path': os.path.join(table, f'month={month}', filename),
+            'batch': batch,
+            'status': 'pending',
+            'rows': len(part),
+            # Rango de órdenes contenido: permite ubicar los detalles de una orden
+            'min_order_id': int(part[order_key].min()),
+            'max_order_id': int(part[order_key].max())
+        }
+        if table == 'order':
+            entry['total'] = float(part['total'].sum())
+        entries.append(entry)
+    return entries
+
+
+def _discard_entries(manifest, entries):
+    paths = {entry['path'] for entry in entries}
+    manifest['files'] = [e for e in manifest['files'] if e['path'] not in paths]
+    for path in paths:
+        full_path = os.path.join(_archive_dir(), path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+
+
+def _resolve_pending():
+    """Resuelve los lotes que quedaron 'pending' por una ejecución interrumpida.
+
+    El borrado de cada lote es una sola transacción: si ninguna de sus órdenes sigue en
+    la tabla viva, el borrado se confirmó y el lote pasa a 'committed'; si no, se
+    descartan sus archivos y se volverá a archivar.
+    """
+    manifest = load_manifest()
+    batches = {}
+    for entry in manifest['files']:
+        if entry.get('status') == 'pending':
+            batches.setdefault(entry['batch'], []).append(entry)
+    if not batches:
+        return
+
+    for batch, entries in batches.items():
+        order_ids = []
+        for entry in entries:
+            if entry['table'] == 'order':
+                path = os.path.join(_archive_dir(), entry['path'])
+                if os.path.exists(path):
+                    order_ids += pd.read_parquet(path, columns=['id'])['id'].tolist()
+        still_hot = order_ids and Order.query.filter(Order.id.in_(order_ids)).count()
+        if order_ids and not still_hot:
+            for entry in entries:
+                entry['status'] = 'committed'
+                entry['committed_at'] = time.time()
+        else:
+            _discard_entries(manifest, entries)
+    _save_manifest(manifest)
+
+
+def _is_iso_date(value):
+    try:
+        return len(value) == 10 and date.fromisoformat(value) is not None
+    except (TypeError, ValueError):
+        return False
+
+
+def archive_orders(cutoff, chunk_size=None):
+    """Mueve las órdenes con fecha anterior a ``cutoff`` (YYYY-MM-DD) y sus detalles a
+    archivos Parquet particionados por mes, borrándolas de las tablas en lotes.
+
+    Cada lote escribe sus archivos, los registra en el manifiesto como 'pending', borra
+    las filas y recién después del commit los marca 'committed'. Las lecturas solo ven
+    lotes confirmados, y una ejecución posterior resuelve los que quedaron pendientes.
+    Las órdenes cuya fecha no tiene formato YYYY-MM-DD no se archivan y se informan.
+    """
+    cutoff = date.fromisoformat(cutoff).isoformat()
+    chunk_size = chunk_size or current_app.config['ARCHIVE_CHUNK_SIZE']
+    archived_orders = archived_details = 0
+    skipped = []
+    last_id = 0
+
+    with _manifest_lock:
+        _resolve_pending()
+
+    while True:
+        # Paginación por id: las filas omitidas no vuelven a seleccionarse
+        orders = db.session.query(*[getattr(Order, c) for c in ORDER_COLUMNS]) \
+            .filter(Order.date < cutoff, Order.id > last_id) \
+            .order_by(Order.id).limit(chunk_size).all()
+        if not orders:
+            break
+        first_id, last_id = orders[0].id, orders[-1].id
+        chunk_skipped = [o.id for o in orders if not _is_iso_date(o.date)]
+        orders = [o for o in orders if _is_iso_date(o.date)]
+        if not orders:
+            skipped += chunk_skipped
+            continue
+
+        batch = uuid.uuid4().hex
+        order_ids = [o.id for o in orders]
+        details = db.session.query(*[getattr(OrderDetail, c) for c in DETAIL_COLUMNS]) \
+            .filter(OrderDetail.order_id.in_(order_ids)).all()
+
+        orders_df = pd.DataFrame(orders, columns=ORDER_COLUMNS)
+        details_df = pd.DataFrame(details, columns=DETAIL_COLUMNS)
+        order_month = dict(zip(orders_df['id'], orders_df['date'].str.slice(0, 7)))
+
+        entries = _write_partitions('order', orders_df, orders_df['date'].str.slice(0, 7), batch)
+        if not details_df.empty:
+            entries += _write_partitions('order_detail', details_df,
+                                         details_df['order_id'].map(order_month), batch)
+
+        with _manifest_lock:
+            manifest = load_manifest()
+            manifest['files'].extend(entries)
+            _save_manifest(manifest)
+            try:
+                # Solo se borran los detalles que se escribieron en el archivo
+                detail_ids = details_df['id'].tolist()
+                if detail_ids:
+                    OrderDetail.query.filter(OrderDetail.id.in_(detail_ids)).delete(synchronize_session=False)
+                leftover = OrderDetail.query.filter(OrderDetail.order_id.in_(order_ids)).count()
+                if not leftover:
+                    Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                _discard_entries(manifest, entries)
+                _save_manifest(manifest)
+                raise
+            if leftover:
+                # Se agregaron detalles después de la lectura: se descarta el lote y se
+                # vuelve a leer el mismo tramo de órdenes
+                db.session.rollback()
+                _discard_entries(manifest, entries)
+                _save_manifest(manifest)
+                last_id = first_id - 1
+                continue
+            committed_at = time.time()
+            for entry in entries:
+                entry['status'] = 'committed'
+                entry['committed_at'] = committed_at
+            _save_manifest(manifest)
+
+        skipped += chunk_skipped
+        archived_orders += len(orders_df)
+        archived_details += len(details_df)
+
+    return {'orders': archived_orders, 'details': archived_details, 'cutoff': cutoff, 'skipped': skipped}
+
+
+# ======= LECTURA =======
+def _archive_files(table, date_from=None, date_to=None, order_id=None):
+    # Solo las particiones que pueden contener filas del rango pedido
+    month_from = date_from[:7] if date_from else None
+    month_to = date_to[:7] if date_to else None
+    paths = []
+    for entry in load_manifest()['files']:
+        if entry['table'] != table or entry.get('status', 'committed') != 'committed':
+            continue
+        if month_from and entry['month'] < month_from:
+            continue
+        if month_to and entry['month'] > month_to:
+            continue
+        if order_id is not None and not entry['min_order_id'] <= order_id <= entry['max_order_id']:
+            continue
+        paths.append(os.path.join(_archive_dir(), entry['path']))
+    return paths
+
+
+def archive_totals():
+    """Cantidad y suma de órdenes archivadas, leídas del manifiesto sin abrir archivos."""
+    count = total = 0
+    for entry in load_manifest()['files']:
+        if entry['table'] == 'order' and entry.get('status', 'committed') == 'committed':
+            count += entry['rows']
+            total += entry['total']
+    return count, total
+
+
+def last_archived_at():
+    """Momento (epoch) del último lote confirmado; 0 si no hay ninguno registrado."""
+    return max((e.get('committed_at', 0) for e in load_manifest()['files']
+                if e.get('status', 'committed') == 'committed'), default=0)
+
+
+def orders_frame(date_from=None, date_to=None, client_id=None, seller_id=None):
+    """Órdenes de las tablas vivas más las archivadas, filtradas y ordenadas por id."""
+    query = Order.query
+    if date_from:
+        query = query.filter(Order.date >= date_from)
+    if date_to:
+        query = query.filter(Order.date <= date_to)
+    if client_id:
+        query = query.filter(Order.client_id == client_id)
+    if seller_id:
+        query = query.filter(Order.seller_id == seller_id)
+    hot = pd.DataFrame([{
+        'id': o.id,
+        'client_id': o.client_id,
+        'seller_id': o.seller_id,
+        'date': o.date,
+        'total': o.total
+    } for o in query.all()], columns=ORDER_COLUMNS)
+
+    paths = _archive_files('order', date_from, date_to)
+    if not paths:
+        return hot
+
+    cold = pd.concat([pd.read_parquet(p, columns=ORDER_COLUMNS) for p in paths], ignore_index=True)
+    if date_from:
+        cold = cold[cold['date'] >= date_from]
+    if date_to:
+        cold = cold[cold['date'] <= date_to]
+    if client_id:
+        cold = cold[cold['client_id'].astype(str) == str(client_id)]
+    if seller_id:
+        cold = cold[cold['seller_id'].astype(str) == str(seller_id)]
+
+    # Defensa ante duplicados: una sola copia por id en el archivo, y gana la tabla viva
+    cold = cold.drop_duplicates('id')
+    cold = cold[~cold['id'].isin(hot['id'])]
+    return pd.concat([hot, cold], ignore_index=True).sort_values('id', ignore_index=True)
+
+
+def archived_order_details(order_id):
+    paths = _archive_files('order_detail', order_id=order_id)
+    frames = [pd.read_parquet(p, columns=DETAIL_COLUMNS, filters=[('order_id', '==', order_id)]) for p in paths]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return []
+    return pd.concat(frames, ignore_index=True).drop_duplicates('id').sort_values('id').to_dict('records')
+
+
+def _parse_cutoff(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise click.BadParameter('debe tener formato YYYY-MM-DD')
+
+
+def init_app(app):
+    @app.cli.command('archive-orders')
+    @click.option('--before', callback=_parse_cutoff,
+                  help='Fecha de corte YYYY-MM-DD (por defecto ARCHIVE_AFTER_DAYS).')
+    @click.option('--chunk-size', type=int, default=None, help='Órdenes por transacción.')
+    def archive_orders_command(before, chunk_size):
+        """Archiva las órdenes antiguas en Parquet y las borra de la base."""
+        cutoff = before or (date.today() - timedelta(days=app.config['ARCHIVE_AFTER_DAYS'])).isoformat()
+        result = archive_orders(cutoff, chunk_size)
+        click.echo(f"Archivadas {result['orders']} órdenes y {result['details']} detalles anteriores a {cutoff}.")
+        if result['skipped']:
+            click.echo(f"Omitidas {len(result['skipped'])} órdenes con fecha fuera de formato YYYY-MM-DD: "
+                       f"{result['skipped'][:20]}", err=True)
@@ -0,0 +1,85 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se negocia gzip
+    brotli = None
+
+
+def _supported_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def _is_compressible(response, config):
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return False
+    if 'Content-Range' in response.headers:
+        return False
+    mimetype = response.mimetype or ''
+    if any(mimetype.startswith(prefix) for prefix in config['COMPRESS_EXCLUDED_MIMETYPES']):
+        return False
+    length = response.content_length
+    if length is not None and length < config['COMPRESS_MIN_SIZE']:
+        return False
+    return True
+
+
+def _compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'])
+
+
+def _compress_stream(chunks, encoding, config):
+    # Comprime respuestas por partes (generadores, send_file) sin cargarlas completas
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESS_BR_QUALITY'])
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = process(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_app(app):
+    """Registra la compresión gzip/brotli negociada con Accept-Encoding."""
+    config = app.config
+
+    @app.after_request
+    def compress_response(response):
+        if not config['COMPRESS_ENABLED'] or not _is_compressible(response, config):
+            return response
+
+        encoding = request.accept_encodings.best_match(_supported_encodings())
+        if not encoding:
+            return response
+
+        if response.is_streamed or response.direct_passthrough:
+            response.direct_passthrough = False
+            response.response = _compress_stream(response.response, encoding, config)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(_compress(data, encoding, config))
+
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -6,4 +6,51 @@ class Config:
     SECRET_KEY = 'erp-ferreteria-secret-key'
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'erp.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = 'erp-ferreteria-jwt-secret'
\ No newline at end of file
+    # Réplica de solo lectura (p. ej. 'sqlite:///.../erp_replica.db' o una réplica PostgreSQL)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    JWT_SECRET_KEY = 'erp-ferreteria-jwt-secret'
+
+    # Pronóstico de demanda y sugerencias de reposición (/inventory/reorder)
+    FORECAST_HISTORY_DAYS = 730
+    FORECAST_WINDOW_DAYS = 28
+    FORECAST_ALPHA = 0.1
+    FORECAST_LEAD_TIME_DAYS = 7
+    FORECAST_REVIEW_DAYS = 14
+    FORECAST_SERVICE_Z = 1.65
+
+    # Serialización JSON: 'auto' (orjson si está instalado), 'orjson' o 'stdlib'
+    JSON_PROVIDER = 'auto'
+
+    # Compresión gzip/brotli de respuestas según Accept-Encoding
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_QUALITY = 4
+    # xlsx ya es un zip: recomprimirlo solo gasta CPU
+    COMPRESS_EXCLUDED_MIMETYPES = (
+        'image/',
+        'application/zip',
+        'application/gzip',
+        'application/vnd.openxmlformats-officedocument.',
+    )
+
+    # Enrutamiento lectura/escritura (ver app/routing.py)
+    DB_REPLICA_BIND = 'replica'
+    DB_REPLICA_MAX_LAG_SECONDS = 30
+    DB_REPLICA_LAG_CHECK_SECONDS = 5
+    DB_READ_YOUR_WRITES_SECONDS = 10
+
+    # Autocompletar de productos (/products/suggest)
+    SUGGEST_RANK_DAYS = 30
+    # Prefijos con más entradas que esto se responden desde un top-N precalculado
+    SUGGEST_MAX_SCAN = 1000
+    SUGGEST_TOP_N = 50
+    # Sincronización con cambios de otros procesos y reconstrucción completa periódica
+    SUGGEST_SYNC_SECONDS = 5
+    SUGGEST_REBUILD_SECONDS = 300
+
+    # Archivo de órdenes antiguas en Parquet (flask archive-orders)
+    ARCHIVE_DIR = os.path.join(os.path.dirname(basedir), 'archive')
+    ARCHIVE_AFTER_DAYS = 1095  # mayor que FORECAST_HISTORY_DAYS: el pronóstico lee solo tablas vivas
+    ARCHIVE_CHUNK_SIZE = 5000
+    ARCHIVE_COMPRESSION = 'zstd'
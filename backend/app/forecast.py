@@ -0,0 +1,158 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from flask import current_app
+
+from . import db
+from .models import Product, Order, OrderDetail
+
+# Caché de velocidades de venta; se recalcula solo cuando cambian las ventas o el día
+_cache = {'signature': None, 'velocity': None}
+_lock = threading.Lock()
+
+
+def _day_number(column):
+    # Día juliano de una fecha 'YYYY-MM-DD...' guardada como texto; NULL/0 si no es válida
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return db.func.julianday(db.func.substr(column, 1, 10))
+    day = sa.cast(db.func.to_char(sa.cast(db.func.substr(column, 1, 10), sa.Date), 'J'), sa.Integer)
+    return sa.case((column.regexp_match(r'^\d{4}-\d{2}-\d{2}'), day), else_=0)
+
+
+def _sales_signature():
+    """Checksum de las ventas calculado en la base, igual para todos los procesos.
+
+    Cambia al agregar o borrar filas y al editar la fecha de una orden o la cantidad o
+    el producto de un detalle, aunque la cantidad y el id máximo se mantengan.
+    """
+    details = db.session.query(
+        db.func.count(OrderDetail.id),
+        db.func.max(OrderDetail.id),
+        db.func.sum(OrderDetail.id * OrderDetail.quantity),
+        db.func.sum(OrderDetail.id * OrderDetail.product_id)
+    ).one()
+    orders = db.session.query(
+        db.func.count(Order.id),
+        db.func.max(Order.id),
+        db.func.sum(Order.id * _day_number(Order.date))
+    ).one()
+    return (*details, *orders, date.today().isoformat())
+
+
+def _compute_velocity(today, history_days, window_days, alpha):
+    """Carga las ventas diarias por producto en una sola consulta agregada y calcula,
+    sin bucles por producto, la media móvil, el suavizado exponencial y la desviación."""
+    cutoff = (today - timedelta(days=history_days - 1)).isoformat()
+    stmt = db.session.query(
+        OrderDetail.product_id.label('product_id'),
+        Order.date.label('date'),
+        db.func.sum(OrderDetail.quantity).label('qty')
+    ).join(Order, Order.id == OrderDetail.order_id) \
+     .filter(Order.date >= cutoff) \
+     .group_by(OrderDetail.product_id, Order.date) \
+     .statement
+
+    # La conexión de la sesión respeta el enrutamiento a la réplica
+    df = pd.read_sql(stmt, db.session.connection())
+
+    df['date'] = pd.to_datetime(df['date'].str.slice(0, 10), errors='coerce')
+    df = df.dropna(subset=['date'])
+    age = (pd.Timestamp(today) - df['date']).dt.days.to_numpy()
+    keep = (age >= 0) & (age < history_days)
+    age = age[keep]
+    qty = df['qty'].to_numpy(dtype=np.float64)[keep]
+
+    product_ids, idx = np.unique(df['product_id'].to_numpy()[keep], return_inverse=True)
+    n = len(product_ids)
+
+    # Media móvil y varianza de la demanda diaria (los días sin venta cuentan como cero)
+    recent = age < window_days
+    sma = np.bincount(idx, weights=np.where(recent, qty, 0.0), minlength=n) / window_days
+    sq = np.bincount(idx, weights=np.where(recent, qty * qty, 0.0), minlength=n) / window_days
+    std = np.sqrt(np.maximum(sq - sma * sma, 0.0))
+
+    # Suavizado exponencial: cada venta pesa alpha * (1 - alpha) ** antigüedad
+    ewma = np.bincount(idx, weights=qty * alpha * np.power(1.0 - alpha, age), minlength=n)
+
+    return {'product_ids': product_ids, 'sma': sma, 'ewma': ewma, 'std': std}
+
+
+def get_velocity():
+    config = current_app.config
+    signature = _sales_signature()
+    with _lock:
+        if _cache['signature'] != signature:
+            _cache['velocity'] = _compute_velocity(
+                date.today(),
+                config['FORECAST_HISTORY_DAYS'],
+                config['FORECAST_WINDOW_DAYS'],
+                config['FORECAST_ALPHA']
+            )
+            _cache['signature'] = signature
+        return _cache['velocity']
+
+
+def reorder_report(category=None, only_needed=True):
+    """Calcula días de cobertura, punto de pedido y cantidad sugerida para todos los
+    productos (o los de una categoría) con el stock actual."""
+    config = current_app.config
+    lead_time = config['FORECAST_LEAD_TIME_DAYS']
+    review_days = config['FORECAST_REVIEW_DAYS']
+    service_z = config['FORECAST_SERVICE_Z']
+    velocity = get_velocity()
+
+    query = db.session.query(Product.id, Product.name, Product.category, Product.stock)
+    if category:
+        query = query.filter(Product.category == category)
+    rows = query.order_by(Product.id).all()
+    if not rows:
+        return []
+
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    stock = np.array([r[3] or 0 for r in rows], dtype=np.float64)
+
+    # Mapea cada producto a su fila de velocidades; sin ventas -> demanda cero
+    sma = np.zeros(len(ids))
+    daily = np.zeros(len(ids))
+    std = np.zeros(len(ids))
+    known = velocity['product_ids']
+    if len(known):
+        pos = np.minimum(np.searchsorted(known, ids), len(known) - 1)
+        has_sales = known[pos] == ids
+        sma[has_sales] = velocity['sma'][pos[has_sales]]
+        daily[has_sales] = velocity['ewma'][pos[has_sales]]
+        std[has_sales] = velocity['std'][pos[has_sales]]
+
+    safety_stock = service_z * std * np.sqrt(lead_time)
+    reorder_point = daily * lead_time + safety_stock
+    suggested = np.ceil(np.maximum(reorder_point + daily * review_days - stock, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(daily > 0, stock / daily, np.inf)
+    needs_reorder = (stock <= reorder_point) & (daily > 0)
+
+    selected = np.flatnonzero(needs_reorder) if only_needed else np.arange(len(ids))
+    selected = selected[np.argsort(days_of_cover[selected], kind='stable')]
+
+    # tolist() devuelve tipos nativos de Python, serializables por jsonify
+    sma = sma.round(3).tolist()
+    daily = daily.round(3).tolist()
+    cover = days_of_cover.round(1).tolist()
+    reorder_point = np.ceil(reorder_point).astype(np.int64).tolist()
+    suggested = suggested.astype(np.int64).tolist()
+    needs_reorder = needs_reorder.tolist()
+
+    return [{
+        'id': rows[i][0],
+        'name': rows[i][1],
+        'category': rows[i][2],
+        'stock': rows[i][3],
+        'avg_daily_sales': sma[i],
+        'forecast_daily_sales': daily[i],
+        'days_of_cover': None if cover[i] == float('inf') else cover[i],
+        'reorder_point': reorder_point[i],
+        'suggested_quantity': suggested[i],
+        'needs_reorder': needs_reorder[i]
+    } for i in selected.tolist()]
@@ -0,0 +1,50 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el codificador estándar
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Proveedor JSON basado en orjson.
+
+    Mantiene el comportamiento de DefaultJSONProvider (claves ordenadas, tipos extra vía
+    ``default``, sangría en modo debug) y escribe los bytes de orjson directamente en la
+    respuesta, sin pasar por str.
+    """
+
+    def _options(self):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _dumpb(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj, **kwargs):
+        # Opciones específicas de json (cls, indent, ...) siguen usando la biblioteca estándar
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumpb(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumpb(obj), mimetype=self.mimetype)
+
+
+def get_json_provider_class(name='auto'):
+    """Devuelve la clase de proveedor según JSON_PROVIDER: 'auto', 'orjson' o 'stdlib'."""
+    if name == 'stdlib':
+        return DefaultJSONProvider
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER='orjson' requiere instalar el paquete orjson")
+    return OrjsonProvider if orjson is not None else DefaultJSONProvider
@@ -74,6 +74,7 @@ class Log(db.Model):
     action = db.Column(db.String(50), nullable=False)
     target_type = db.Column(db.String(50), nullable=False)
     target_id = db.Column(db.Integer, nullable=True)
+    details = db.Column(db.Text, nullable=True)  # JSON con parámetros de acciones masivas
     timestamp = db.Column(db.DateTime, nullable=False, default=db.func.now())
 
     user = db.relationship('User', backref=db.backref('logs', lazy=True))
@@ -1,14 +1,22 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from . import db
 from .models import User, Seller, Client, Product, Order, OrderDetail
 import pandas as pd
 import io
+import json
+import math
+import time
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from functools import wraps
+from sqlalchemy import update, bindparam
 from .models import Log
+from .forecast import reorder_report
+from .routing import db_route
+from .suggest import suggest_index
+from .archive import orders_frame, archive_totals, archived_order_details, last_archived_at
 
 main = Blueprint('main', __name__)
 
@@ -185,6 +193,7 @@ def delete_client(client_id):
 
 @main.route('/clients/search', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def search_clients():
     query = request.args.get('q', '').strip()
     if not query:
@@ -229,6 +238,7 @@ def create_product():
     )
     db.session.add(product)
     db.session.commit()
+    suggest_index.upsert(product.id, product.name, product.category)
 
     return jsonify({'message': 'Producto creado correctamente'})
 
@@ -259,6 +269,7 @@ def update_product(product_id):
     product.stock = data.get('stock', product.stock)
     product.category = data.get('category', product.category)
     db.session.commit()
+    suggest_index.upsert(product.id, product.name, product.category)
     return jsonify({'message': 'Producto actualizado correctamente'})
 
 @main.route('/products/<int:product_id>', methods=['DELETE'])
@@ -267,8 +278,200 @@ def delete_product(product_id):
     product = Product.query.get_or_404(product_id)
     db.session.delete(product)
     db.session.commit()
+    suggest_index.remove(product_id)
     return jsonify({'message': 'Producto eliminado correctamente'})
 
+@main.route('/products/suggest', methods=['GET'])
+@jwt_required()
+def suggest_products():
+    prefix = request.args.get('prefix', '').strip()
+    if not prefix:
+        return jsonify({'message': 'Debe enviar el parámetro ?prefix=valor'}), 400
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify(suggest_index.suggest(prefix, limit=limit))
+
+# ======= ACTUALIZACIÓN MASIVA DE PRODUCTOS =======
+BULK_CHUNK_SIZE = 500
+BULK_PREVIEW_LIMIT = 20
+
+def _is_int(value):
+    # bool es subclase de int, pero True no es un id ni un ajuste válido
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _bulk_conditions(data):
+    # Filtros: categoría y/o lista de ids; devuelve (condiciones, mensaje de error)
+    conditions = []
+    if data.get('category'):
+        conditions.append(Product.category == data['category'])
+    ids = data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(_is_int(i) for i in ids):
+            return None, "'ids' debe ser una lista de enteros"
+        conditions.append(Product.id.in_(ids))
+    # Sin filtro se afectaría todo el catálogo: solo con 'all': true explícito
+    if not conditions and data.get('all') is not True:
+        return None, "Debe enviar 'category', 'ids' o 'all': true"
+    return conditions, None
+
+def _bulk_items(data, field):
+    # Valida [{'id': 1, field: valor}, ...]; devuelve ({id: valor}, mensaje de error)
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return None, "Debe enviar 'items' como lista no vacía"
+    rows = {}
+    for item in items:
+        if not isinstance(item, dict) or not _is_int(item.get('id')):
+            return None, "Cada item debe tener un 'id' entero"
+        value = item.get(field)
+        if field == 'price':
+            if not isinstance(value, (int, float)) or isinstance(value, bool) \
+                    or not math.isfinite(value) or value < 0:
+                return None, f"Precio inválido para el id {item['id']}: debe ser un número finito >= 0"
+            value = float(value)
+        elif not _is_int(value):
+            return None, f"'delta' inválido para el id {item['id']}: debe ser un entero"
+        if item['id'] in rows:
+            return None, f"El id {item['id']} está repetido en 'items'"
+        rows[item['id']] = value
+    return rows, None
+
+@main.route('/products/bulk', methods=['PATCH'])
+@jwt_required()
+def bulk_update_products():
+    """Aplica cambios de precio/stock en bloque con sentencias UPDATE por conjunto.
+
+    Operaciones:
+      - price_factor: {'factor': 1.08, 'category': 'X', 'ids': [...]} -> price = price * factor
+                      (sin category ni ids exige 'all': true)
+      - price_list:   {'items': [{'id': 1, 'price': 10.5}, ...]}      -> precio absoluto por id
+      - stock_adjust: {'items': [{'id': 1, 'delta': -3}, ...]}        -> stock = stock + delta
+                      (se rechaza si algún stock quedaría negativo)
+    Con 'dry_run': true no se escribe nada y se devuelve una vista previa.
+    """
+    data = request.get_json() or {}
+    operation = data.get('operation')
+    dry_run = bool(data.get('dry_run', False))
+    table = Product.__table__
+
+    if operation == 'price_factor':
+        try:
+            factor = float(data.get('factor'))
+        except (TypeError, ValueError):
+            return jsonify({'message': 'Debe enviar un factor numérico'}), 400
+        if not math.isfinite(factor) or factor <= 0:
+            return jsonify({'message': 'El factor debe ser un número finito mayor que cero'}), 400
+
+        conditions, error = _bulk_conditions(data)
+        if error:
+            return jsonify({'message': error}), 400
+        new_price = db.func.round(Product.price * factor, 2)
+        if dry_run:
+            affected = Product.query.filter(*conditions).count()
+            preview = db.session.query(Product.id, Product.name, Product.price, new_price) \
+                .filter(*conditions).order_by(Product.id).limit(BULK_PREVIEW_LIMIT).all()
+            preview_data = [{'id': r[0], 'name': r[1], 'price': r[2], 'new_price': r[3]} for r in preview]
+        else:
+            result = db.session.execute(
+                update(Product).where(*conditions).values(price=new_price)
+                .execution_options(synchronize_session=False)
+            )
+            affected = result.rowcount
+        missing = []
+
+    elif operation in ('price_list', 'stock_adjust'):
+        field = 'price' if operation == 'price_list' else 'delta'
+        rows, error = _bulk_items(data, field)
+        if error:
+            return jsonify({'message': error}), 400
+
+        if operation == 'price_list':
+            stmt = table.update().where(table.c.id == bindparam('b_id')) \
+                .values(price=bindparam('b_value'))
+        else:
+            # La guarda en el WHERE cubre ventas concurrentes entre la lectura y la escritura
+            stmt = table.update() \
+                .where(table.c.id == bindparam('b_id'), table.c.stock + bindparam('b_value') >= 0) \
+                .values(stock=table.c.stock + bindparam('b_value'))
+
+        ids = list(rows)
+        affected = 0
+        found = set()
+        negative = []
+        conflict = False
+        preview_data = []
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_CHUNK_SIZE]
+            current = db.session.query(Product.id, Product.name, Product.price, Product.stock) \
+                .filter(Product.id.in_(chunk)).all()
+            found.update(r[0] for r in current)
+            if operation == 'stock_adjust':
+                negative.extend(r[0] for r in current if r[3] + rows[r[0]] < 0)
+            if negative or conflict:
+                # No se escribe nada más: se deshace todo al terminar la validación
+                continue
+            if dry_run:
+                for r in current:
+                    if len(preview_data) >= BULK_PREVIEW_LIMIT:
+                        break
+                    if operation == 'price_list':
+                        preview_data.append({'id': r[0], 'name': r[1], 'price': r[2], 'new_price': rows[r[0]]})
+                    else:
+                        preview_data.append({'id': r[0], 'name': r[1], 'stock': r[3], 'new_stock': r[3] + rows[r[0]]})
+            elif current:
+                params = [{'b_id': r[0], 'b_value': rows[r[0]]} for r in current]
+                if db.session.get_bind().dialect.supports_sane_multi_rowcount:
+                    changed = db.session.execute(stmt, params).rowcount
+                else:
+                    changed = sum(db.session.execute(stmt, p).rowcount for p in params)
+                if operation == 'stock_adjust' and changed < len(params):
+                    # Algún UPDATE no pasó la guarda: el stock cambió desde la lectura
+                    conflict = True
+                    continue
+            affected += len(current)
+        missing = [i for i in ids if i not in found]
+
+        if negative:
+            db.session.rollback()
+            return jsonify({
+                'message': 'El ajuste dejaría stock negativo; no se aplicó ningún cambio',
+                'negative_stock_ids': negative
+            }), 400
+        if conflict:
+            db.session.rollback()
+            return jsonify({
+                'message': 'El stock cambió durante el ajuste y quedaría negativo; no se aplicó ningún cambio'
+            }), 409
+
+    else:
+        return jsonify({'message': 'Operación no válida (price_factor, price_list, stock_adjust)'}), 400
+
+    if dry_run:
+        db.session.rollback()
+        return jsonify({
+            'dry_run': True,
+            'operation': operation,
+            'affected': affected,
+            'missing': missing,
+            'preview': preview_data
+        })
+
+    # Parámetros suficientes para reconstruir la operación desde la auditoría
+    details = {'affected': affected, 'missing': missing}
+    if operation == 'price_factor':
+        details.update(factor=factor, category=data.get('category'), ids=data.get('ids'), all=data.get('all') is True)
+    else:
+        details['items'] = {str(i): v for i, v in rows.items() if i in found}
+
+    # registrar_log confirma la transacción: cambios y auditoría quedan juntos
+    registrar_log(int(get_jwt_identity()), f'bulk_{operation}', 'product', None, details)
+
+    return jsonify({
+        'message': 'Productos actualizados correctamente',
+        'operation': operation,
+        'affected': affected,
+        'missing': missing
+    })
+
 # ======= ÓRDENES =======
 @main.route('/orders', methods=['POST'])
 @jwt_required()
@@ -338,6 +541,7 @@ def add_product_to_order(order_id):
     detail = OrderDetail(order_id=order_id, product_id=product_id, quantity=quantity, unit_price=unit_price)
     db.session.add(detail)
     db.session.commit()
+    suggest_index.record_sale(detail.product_id, detail.quantity)
 
     return jsonify({'message': 'Producto agregado a la orden correctamente'})
 
@@ -354,14 +558,25 @@ def list_order_details(order_id):
             'unit_price': d.unit_price
         } for d in details
     ]
+    if not details_data:
+        # La orden puede estar archivada
+        details_data = archived_order_details(order_id)
     return jsonify(details_data)
 
 # ======= ESTADÍSTICAS =======
 @main.route('/stats', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def get_stats():
-    total_orders = Order.query.count()
-    total_sales = db.session.query(db.func.sum(Order.total)).scalar() or 0
+    # Un lote archivado hace poco puede seguir en la réplica y contarse también en el
+    # manifiesto; mientras pueda estar dentro del retraso tolerado se lee del primario
+    config = current_app.config
+    window = config['DB_REPLICA_MAX_LAG_SECONDS'] + config['DB_REPLICA_LAG_CHECK_SECONDS']
+    if time.time() - last_archived_at() < window:
+        g.db_route = 'primary'
+    archived_orders, archived_sales = archive_totals()
+    total_orders = Order.query.count() + archived_orders
+    total_sales = (db.session.query(db.func.sum(Order.total)).scalar() or 0) + archived_sales
     total_products = Product.query.count()
     total_clients = Client.query.count()
     total_sellers = Seller.query.count()
@@ -375,20 +590,22 @@ def get_stats():
     })
 
 
+# ======= INVENTARIO: SUGERENCIAS DE REPOSICIÓN =======
+@main.route('/inventory/reorder', methods=['GET'])
+@jwt_required()
+@db_route('replica')
+def inventory_reorder():
+    category = request.args.get('category', '').strip() or None
+    only_needed = request.args.get('all', '').lower() not in ('1', 'true', 'si', 'sí')
+    return jsonify(reorder_report(category=category, only_needed=only_needed))
+
 # ======= EXPORTACIÓN DE ÓRDENES A EXCEL =======
 @main.route('/export/orders', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def export_orders():
-    orders = Order.query.all()
-    orders_data = [{
-        'id': o.id,
-        'client_id': o.client_id,
-        'seller_id': o.seller_id,
-        'date': o.date,
-        'total': o.total
-    } for o in orders]
-
-    df = pd.DataFrame(orders_data)
+    # Incluye órdenes archivadas; date_from/date_to acotan las particiones leídas
+    df = orders_frame(date_from=request.args.get('date_from'), date_to=request.args.get('date_to'))
 
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
@@ -405,6 +622,7 @@ def export_orders():
 
 @main.route('/export/clients/pdf', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def export_clients_pdf():
     clients = Client.query.all()
 
@@ -452,6 +670,7 @@ def export_clients_pdf():
 
 @main.route('/export/products/pdf', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def export_products_pdf():
     products = Product.query.all()
 
@@ -497,6 +716,7 @@ def export_products_pdf():
 
 @main.route('/export/sellers/pdf', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def export_sellers_pdf():
     sellers = Seller.query.all()
 
@@ -540,8 +760,12 @@ def export_sellers_pdf():
 
 @main.route('/export/orders/pdf', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def export_orders_pdf():
-    orders = Order.query.all()
+    orders = orders_frame(
+        date_from=request.args.get('date_from'),
+        date_to=request.args.get('date_to')
+    ).itertuples(index=False)
 
     output = io.BytesIO()
     c = canvas.Canvas(output, pagesize=letter)
@@ -584,6 +808,7 @@ def export_orders_pdf():
 
 @main.route('/products/search', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def search_products():
     query = request.args.get('q', '').strip()
     if not query:
@@ -608,36 +833,23 @@ def search_products():
 
 @main.route('/orders/search', methods=['GET'])
 @jwt_required()
+@db_route('replica')
 def search_orders():
     client_id = request.args.get('client_id')
     seller_id = request.args.get('seller_id')
     date = request.args.get('date')  # formato 'YYYY-MM-DD'
 
-    query = Order.query
-    if client_id:
-        query = query.filter(Order.client_id == client_id)
-    if seller_id:
-        query = query.filter(Order.seller_id == seller_id)
-    if date:
-        query = query.filter(Order.date == date)
-
-    results = query.all()
-    data = [{
-        'id': o.id,
-        'client_id': o.client_id,
-        'seller_id': o.seller_id,
-        'date': o.date,
-        'total': o.total
-    } for o in results]
-
-    return jsonify(data)
+    # Busca en tablas vivas y archivo; con fecha solo se lee la partición de ese mes
+    results = orders_frame(date_from=date, date_to=date, client_id=client_id, seller_id=seller_id)
+    return jsonify(results.to_dict('records'))
 
-def registrar_log(user_id, action, target_type, target_id):
+def registrar_log(user_id, action, target_type, target_id, details=None):
     nuevo_log = Log(
         user_id=user_id,
         action=action,
         target_type=target_type,
-        target_id=target_id
+        target_id=target_id,
+        details=json.dumps(details, ensure_ascii=False) if details is not None else None
     )
     db.session.add(nuevo_log)
     db.session.commit()
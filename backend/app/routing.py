@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+import click
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, TimestampSigner
+
+# La última escritura viaja firmada en una cookie y una cabecera que el cliente devuelve,
+# así cualquier proceso puede saber si debe leer del primario
+LAST_WRITE_COOKIE = 'last_write'
+LAST_WRITE_HEADER = 'X-Last-Write'
+_lag = {'checked_at': 0.0, 'seconds': 0.0}
+_lock = threading.Lock()
+
+
+def db_route(target):
+    """Fuerza el destino de las lecturas de una ruta: 'replica' o 'primary'.
+
+    Las escrituras siempre van al primario, sin importar el destino elegido.
+    """
+    if target not in ('replica', 'primary'):
+        raise ValueError("db_route acepta 'replica' o 'primary'")
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            g.db_route = target
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RoutingSession(Session):
+    """Sesión que envía las lecturas de rutas marcadas con db_route('replica') a la
+    réplica y todo lo demás (flush, INSERT/UPDATE/DELETE) al primario."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, sa.UpdateBase):
+                g.db_wrote = True
+            elif g.get('db_route') == 'replica':
+                engine = _replica_engine(self._db)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _user_key():
+    # Identidad JWT si la ruta la verificó; si no, la IP del cliente
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        identity = get_jwt_identity()
+    except RuntimeError:
+        identity = None
+    return identity or request.remote_addr
+
+
+def _signer():
+    return TimestampSigner(current_app.config['SECRET_KEY'], salt='read-your-writes')
+
+
+def _wrote_recently():
+    token = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    if not token:
+        return False
+    try:
+        owner = _signer().unsign(token, max_age=current_app.config['DB_READ_YOUR_WRITES_SECONDS'])
+    except BadSignature:  # incluye tokens vencidos
+        return False
+    return owner.decode('utf-8') == str(_user_key())
+
+
+def _replica_engine(db):
+    config = current_app.config
+    engine = db.engines.get(config['DB_REPLICA_BIND'])
+    if engine is None:
+        return None
+
+    if g.get('db_primary_forced') is None:
+        g.db_primary_forced = _wrote_recently() or _replica_lag(db, engine) > config['DB_REPLICA_MAX_LAG_SECONDS']
+    return None if g.db_primary_forced else engine
+
+
+def _measure_lag(primary, replica):
+    if replica.dialect.name == 'postgresql':
+        # Con el primario inactivo la última transacción reproducida envejece sin que haya
+        # retraso real: si ya se reprodujo todo lo recibido, el retraso es cero
+        with replica.connect() as conn:
+            lag = conn.execute(sa.text(
+                'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+            )).scalar()
+        return float(lag or 0.0)
+    if replica.dialect.name == 'sqlite' and primary.dialect.name == 'sqlite':
+        # Réplica local como copia del archivo: el retraso es la diferencia de mtime
+        return max(os.path.getmtime(primary.url.database) - os.path.getmtime(replica.url.database), 0.0)
+    return 0.0
+
+
+def _replica_lag(db, replica):
+    """Retraso de la réplica en segundos, medido como mucho cada DB_REPLICA_LAG_CHECK_SECONDS.
+    Si no se puede medir se considera infinito y se lee del primario."""
+    now = time.time()
+    with _lock:
+        if now - _lag['checked_at'] < current_app.config['DB_REPLICA_LAG_CHECK_SECONDS']:
+            return _lag['seconds']
+        try:
+            seconds = _measure_lag(db.engines[None], replica)
+        except (OSError, sa.exc.SQLAlchemyError):
+            seconds = float('inf')
+        _lag.update(checked_at=now, seconds=seconds)
+        return seconds
+
+
+def init_app(app, db):
+    @app.after_request
+    def remember_write(response):
+        if g.get('db_wrote'):
+            token = _signer().sign(str(_user_key())).decode('utf-8')
+            response.headers[LAST_WRITE_HEADER] = token
+            response.set_cookie(LAST_WRITE_COOKIE, token, httponly=True, samesite='Lax',
+                                max_age=app.config['DB_READ_YOUR_WRITES_SECONDS'])
+        return response
+
+    @app.cli.command('replica-sync')
+    def replica_sync():
+        """Copia la base SQLite primaria sobre la réplica local (para pruebas)."""
+        primary = db.engines[None]
+        replica = db.engines.get(app.config['DB_REPLICA_BIND'])
+        if replica is None or primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            click.echo('La sincronización local solo aplica a una réplica SQLite configurada.')
+            return
+        source = sqlite3.connect(primary.url.database)
+        target = sqlite3.connect(replica.url.database)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+        click.echo(f'Réplica actualizada: {replica.url.database}')
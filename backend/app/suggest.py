@@ -0,0 +1,234 @@
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+
+
+def normalize(text):
+    """Minúsculas y sin acentos: 'Válvula' -> 'valvula'."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower().strip()
+
+
+class ProductSuggestIndex:
+    """Índice de prefijos en memoria para autocompletar productos en el mostrador.
+
+    Guarda claves normalizadas (nombre completo, cada palabra del nombre, categoría e id)
+    en una lista ordenada con un array paralelo de ids, y responde con bisect. Los
+    resultados se ordenan por ventas recientes. Cada proceso mantiene su propio índice.
+
+    Los prefijos cuyo rango supera SUGGEST_MAX_SCAN entradas (los cortos, que son los
+    primeros que se teclean) se responden desde un top-N por ventas que se calcula una
+    vez y se mantiene al registrar ventas o cambios de productos.
+
+    Los cambios hechos por otros procesos se detectan comparando (cantidad, id máximo)
+    de Product cada SUGGEST_SYNC_SECONDS, y cada SUGGEST_REBUILD_SECONDS se reconstruye
+    todo (ediciones ajenas y ventas que salen de la ventana de SUGGEST_RANK_DAYS). Ambas
+    tareas corren en un hilo aparte mientras se sigue respondiendo con el índice actual.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._ids = array('l')
+        self._products = {}  # id -> (nombre, categoría, claves)
+        self._scores = {}    # id -> unidades vendidas recientemente
+        self._top = {}       # prefijo con rango grande -> ids mejor vendidos, de mayor a menor
+        self._built = False
+        self._signature = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self._app = app
+        with app.app_context():
+            try:
+                self.rebuild()
+            except SQLAlchemyError:
+                # Tablas aún no creadas (p. ej. create_db.py); se construye en el primer uso
+                pass
+
+    def _keys_for(self, product_id, name, category):
+        words = normalize(name).split()
+        keys = {' '.join(words), str(product_id)}
+        keys.update(words)
+        if category:
+            keys.add(normalize(category))
+        keys.discard('')
+        return tuple(sys.intern(k) for k in keys)
+
+    def _product_signature(self):
+        from . import db
+        from .models import Product
+        return tuple(db.session.query(db.func.count(Product.id), db.func.max(Product.id)).one())
+
+    def rebuild(self):
+        from . import db
+        from .models import Product, Order, OrderDetail
+
+        signature = self._product_signature()
+        cutoff = (date.today() - timedelta(days=self._app.config['SUGGEST_RANK_DAYS'])).isoformat()
+        sales = db.session.query(OrderDetail.product_id, db.func.sum(OrderDetail.quantity)) \
+            .join(Order, Order.id == OrderDetail.order_id) \
+            .filter(Order.date >= cutoff) \
+            .group_by(OrderDetail.product_id).all()
+        rows = db.session.query(Product.id, Product.name, Product.category).all()
+
+        products = {}
+        entries = []
+        for product_id, name, category in rows:
+            keys = self._keys_for(product_id, name, category)
+            products[product_id] = (name, category, keys)
+            entries.extend((k, product_id) for k in keys)
+        entries.sort()
+
+        with self._lock:
+            self._keys = [k for k, _ in entries]
+            self._ids = array('l', (i for _, i in entries))
+            self._products = products
+            self._scores = {pid: qty or 0 for pid, qty in sales}
+            self._top = {}
+            self._signature = signature
+            self._built_at = self._checked_at = time.time()
+            self._built = True
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+            return
+        now = time.time()
+        if self._refreshing or now - self._checked_at < self._app.config['SUGGEST_SYNC_SECONDS']:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._checked_at = now
+        force = now - self._built_at >= self._app.config['SUGGEST_REBUILD_SECONDS']
+        threading.Thread(target=self._refresh, args=(force,), daemon=True).start()
+
+    def _refresh(self, force):
+        try:
+            with self._app.app_context():
+                if force or self._product_signature() != self._signature:
+                    self.rebuild()
+        except SQLAlchemyError:
+            pass
+        finally:
+            self._refreshing = False
+
+    def _insert(self, product_id, keys):
+        for key in keys:
+            i = bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._ids.insert(i, product_id)
+
+    def _delete(self, product_id, keys):
+        for key in keys:
+            i = bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._ids[i] == product_id:
+                    del self._keys[i]
+                    del self._ids[i]
+                    break
+                i += 1
+
+    def _rank(self, product_id):
+        return (self._scores.get(product_id, 0), -product_id)
+
+    def _cached_prefixes(self, keys):
+        return {key[:n] for key in keys for n in range(1, len(key) + 1) if key[:n] in self._top}
+
+    def _promote(self, product_id, keys):
+        # Subir el puntaje nunca obliga a recalcular: basta reubicar el id en cada top
+        top_n = self._app.config['SUGGEST_TOP_N']
+        for prefix in self._cached_prefixes(keys):
+            top = self._top[prefix]
+            if product_id not in top:
+                top.append(product_id)
+            top.sort(key=self._rank, reverse=True)
+            del top[top_n:]
+
+    def _drop(self, product_id, keys):
+        # Si el id salía en un top, ese top puede quedar incompleto: se recalcula al consultarlo
+        for prefix in self._cached_prefixes(keys):
+            if product_id in self._top[prefix]:
+                del self._top[prefix]
+
+    def upsert(self, product_id, name, category):
+        if not self._built:
+            return
+        with self._lock:
+            old = self._products.get(product_id)
+            keys = self._keys_for(product_id, name, category)
+            if old is not None:
+                removed = [k for k in old[2] if k not in keys]
+                self._delete(product_id, removed)
+                self._drop(product_id, removed)
+                self._insert(product_id, [k for k in keys if k not in old[2]])
+            else:
+                self._insert(product_id, keys)
+                # Alta local: la firma sigue coincidiendo con la base y no dispara reconstrucción
+                count, max_id = self._signature
+                self._signature = (count + 1, max(max_id or 0, product_id))
+            self._products[product_id] = (name, category, keys)
+            self._promote(product_id, keys)
+
+    def remove(self, product_id):
+        if not self._built:
+            return
+        with self._lock:
+            old = self._products.pop(product_id, None)
+            if old is not None:
+                self._delete(product_id, old[2])
+                self._drop(product_id, old[2])
+                count, max_id = self._signature
+                # Si se borró el id máximo la firma ya no coincide y el próximo chequeo reconstruye
+                self._signature = (count - 1, max_id)
+            self._scores.pop(product_id, None)
+
+    def record_sale(self, product_id, quantity):
+        with self._lock:
+            self._scores[product_id] = self._scores.get(product_id, 0) + (quantity or 0)
+            product = self._products.get(product_id)
+            if product is not None:
+                self._promote(product_id, product[2])
+
+    def suggest(self, prefix, limit=10):
+        self._ensure_built()
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        config = self._app.config
+        with self._lock:
+            keys, ids = self._keys, self._ids
+            i = bisect_left(keys, prefix)
+            end = bisect_left(keys, prefix + '\uffff', i)
+            if end - i <= config['SUGGEST_MAX_SCAN']:
+                best = heapq.nlargest(limit, set(ids[i:end]), key=self._rank)
+            else:
+                top = self._top.get(prefix)
+                if top is None:
+                    # Primera consulta de un prefijo con rango grande: se recorre completo una vez
+                    top = heapq.nlargest(config['SUGGEST_TOP_N'], set(ids[i:end]), key=self._rank)
+                    self._top[prefix] = top
+                best = top[:limit]
+            scores = self._scores
+            return [{
+                'id': pid,
+                'name': self._products[pid][0],
+                'category': self._products[pid][1],
+                'recent_sales': scores.get(pid, 0)
+            } for pid in best]
+
+
+suggest_index = ProductSuggestIndex()
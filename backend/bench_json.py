@@ -0,0 +1,75 @@
+"""Micro-benchmark de serialización JSON y compresión sobre un catálogo sembrado.
+
+Uso: python bench_json.py [cantidad_de_productos]
+"""
+import gzip
+import json
+import random
+import sys
+import timeit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATEGORIES = ['Herramientas', 'Electricidad', 'Plomería', 'Pinturas', 'Tornillería', 'Jardín']
+WORDS = ['martillo', 'llave', 'tubo', 'cable', 'tornillo', 'pintura', 'brocha', 'taladro',
+         'sierra', 'clavo', 'cinta', 'manguera', 'pala', 'codo', 'válvula', 'enchufe']
+
+
+def seed_catalog(n, seed=42):
+    # Misma forma que la respuesta de GET /products
+    rng = random.Random(seed)
+    return [{
+        'id': i,
+        'name': f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.randint(1, 999)}',
+        'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 10))),
+        'price': round(rng.uniform(0.5, 500), 2),
+        'stock': rng.randint(0, 5000),
+        'category': rng.choice(CATEGORIES)
+    } for i in range(1, n + 1)]
+
+
+def bench(label, fn, repeat=5):
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    print(f'  {label:<28}{best * 1000:10.2f} ms')
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    catalog = seed_catalog(n)
+    print(f'Catálogo: {n} productos')
+
+    print('Serialización (mejor de 5):')
+    # Opciones equivalentes a DefaultJSONProvider de Flask
+    bench('json (stdlib)', lambda: json.dumps(catalog, sort_keys=True, ensure_ascii=True))
+    if orjson is not None:
+        bench('orjson', lambda: orjson.dumps(catalog, option=orjson.OPT_SORT_KEYS))
+    else:
+        print('  orjson no instalado')
+
+    body = json.dumps(catalog, sort_keys=True, ensure_ascii=True).encode('utf-8')
+    if orjson is not None:
+        body = orjson.dumps(catalog, option=orjson.OPT_SORT_KEYS)
+
+    print('Bytes en la red:')
+    print(f'  {"sin compresión":<28}{len(body):10d} B')
+    gz = gzip.compress(body, compresslevel=6)
+    print(f'  {"gzip (nivel 6)":<28}{len(gz):10d} B  ({len(gz) / len(body):.1%})')
+    bench('gzip (nivel 6)', lambda: gzip.compress(body, compresslevel=6))
+    if brotli is not None:
+        br = brotli.compress(body, quality=4)
+        print(f'  {"brotli (calidad 4)":<28}{len(br):10d} B  ({len(br) / len(body):.1%})')
+        bench('brotli (calidad 4)', lambda: brotli.compress(body, quality=4))
+    else:
+        print('  brotli no instalado')
+
+
+if __name__ == '__main__':
+    main()
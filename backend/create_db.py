@@ -1,7 +1,17 @@
+from sqlalchemy import inspect, text
+
 from app import create_app, db
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
+
+    # create_all no agrega columnas a tablas existentes: bases creadas antes de Log.details
+    columns = [c['name'] for c in inspect(db.engine).get_columns('log')]
+    if 'details' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE log ADD COLUMN details TEXT'))
+        print("Columna log.details agregada.")
+
     print("Base de datos creada.")
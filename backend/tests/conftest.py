@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from app import create_app, db
+from app.config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp_path, 'erp.db')
+        SQLALCHEMY_BINDS = {}
+        ARCHIVE_DIR = os.path.join(tmp_path, 'archive')
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/register', json={'username': 'admin', 'email': 'admin@erp.com', 'password': 'clave'})
+    token = client.post('/login', json={'username': 'admin', 'password': 'clave'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,189 @@
+import io
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app import archive, create_app, db
+from app.archive import archive_orders, load_manifest
+from app.config import Config
+from app.models import Client, Seller, Product, Order, OrderDetail
+
+
+@pytest.fixture
+def orders(app):
+    with app.app_context():
+        db.session.add_all([
+            Client(name='Cliente', email='cliente@erp.com'),
+            Seller(name='Vendedor', zone='Centro', email='vendedor@erp.com'),
+            Product(name='Martillo', price=10, stock=5),
+        ])
+        db.session.add_all([
+            Order(client_id=1, seller_id=1, date='2020-01-15', total=100),
+            Order(client_id=1, seller_id=1, date='2020-02-20', total=200),
+            Order(client_id=1, seller_id=1, date='2020/01/01', total=300),  # fecha fuera de formato
+            Order(client_id=1, seller_id=1, date='2030-05-01', total=400),
+        ])
+        db.session.add(OrderDetail(order_id=1, product_id=1, quantity=3, unit_price=10))
+        db.session.commit()
+
+
+def test_archive_round_trip(app, client, auth_headers, orders):
+    stats_before = client.get('/stats', headers=auth_headers).get_json()
+
+    with app.app_context():
+        result = archive_orders('2021-01-01')
+        assert result['orders'] == 2
+        assert result['details'] == 1
+        assert result['skipped'] == [3]
+        assert {o.id for o in Order.query.all()} == {3, 4}
+        assert OrderDetail.query.count() == 0
+        assert {e['month'] for e in load_manifest()['files']} == {'2020-01', '2020-02'}
+
+    stats = client.get('/stats', headers=auth_headers).get_json()
+    assert stats['total_orders'] == stats_before['total_orders'] == 4
+    assert stats['total_sales'] == stats_before['total_sales'] == 1000
+
+    found = client.get('/orders/search?date=2020-01-15', headers=auth_headers).get_json()
+    assert [o['id'] for o in found] == [1]
+
+    details = client.get('/orders/1/details', headers=auth_headers).get_json()
+    assert [(d['product_id'], d['quantity']) for d in details] == [(1, 3)]
+
+    response = client.get('/export/orders', headers=auth_headers)
+    exported = pd.read_excel(io.BytesIO(response.data))
+    assert exported['id'].tolist() == [1, 2, 3, 4]
+
+    response = client.get('/export/orders?date_from=2020-02-01&date_to=2020-12-31', headers=auth_headers)
+    assert pd.read_excel(io.BytesIO(response.data))['id'].tolist() == [2]
+
+
+def test_interrupted_before_commit_is_not_counted(app, client, auth_headers, orders, monkeypatch):
+    class Crash(BaseException):
+        pass
+
+    def crash():
+        raise Crash()
+
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'commit', crash)
+        with pytest.raises(Crash):
+            archive_orders('2021-01-01')
+        monkeypatch.undo()
+        db.session.rollback()
+        assert {e['status'] for e in load_manifest()['files']} == {'pending'}
+
+    assert client.get('/stats', headers=auth_headers).get_json()['total_orders'] == 4
+
+    with app.app_context():
+        assert archive_orders('2021-01-01')['orders'] == 2
+        assert {e['status'] for e in load_manifest()['files']} == {'committed'}
+        assert len(load_manifest()['files']) == 3
+
+    stats = client.get('/stats', headers=auth_headers).get_json()
+    assert (stats['total_orders'], stats['total_sales']) == (4, 1000)
+
+
+def test_interrupted_after_commit_is_recovered(app, client, auth_headers, orders, monkeypatch):
+    class Crash(BaseException):
+        pass
+
+    save_manifest = archive._save_manifest
+    calls = []
+
+    def crash_on_flip(manifest):
+        calls.append(1)
+        if len(calls) == 2:  # 1: alta 'pending', 2: paso a 'committed'
+            raise Crash()
+        save_manifest(manifest)
+
+    with app.app_context():
+        monkeypatch.setattr(archive, '_save_manifest', crash_on_flip)
+        with pytest.raises(Crash):
+            archive_orders('2021-01-01')
+        monkeypatch.undo()
+
+        assert archive_orders('2021-01-01')['orders'] == 0
+        assert {e['status'] for e in load_manifest()['files']} == {'committed'}
+
+    found = client.get('/orders/search?client_id=1', headers=auth_headers).get_json()
+    assert [o['id'] for o in found] == [1, 2, 3, 4]
+    stats = client.get('/stats', headers=auth_headers).get_json()
+    assert (stats['total_orders'], stats['total_sales']) == (4, 1000)
+
+
+def test_detail_added_during_archiving_is_not_lost(app, orders, monkeypatch):
+    write_partitions = archive._write_partitions
+    calls = []
+
+    def sale_after_read(table, df, months, batch):
+        # Otro proceso agrega un detalle a la orden 1 después de leer sus detalles
+        if not calls:
+            with db.engine.begin() as conn:
+                conn.execute(OrderDetail.__table__.insert().values(
+                    order_id=1, product_id=1, quantity=2, unit_price=10))
+        calls.append(table)
+        return write_partitions(table, df, months, batch)
+
+    with app.app_context():
+        monkeypatch.setattr(archive, '_write_partitions', sale_after_read)
+        result = archive_orders('2021-01-01')
+        assert (result['orders'], result['details'], result['skipped']) == (2, 2, [3])
+        assert OrderDetail.query.count() == 0
+        manifest = load_manifest()['files']
+        assert sum(e['rows'] for e in manifest if e['table'] == 'order_detail') == 2
+        assert len(os.listdir(os.path.join(app.config['ARCHIVE_DIR'], 'order', 'month=2020-01'))) == 1
+        assert [d['quantity'] for d in archive.archived_order_details(1)] == [3, 2]
+
+
+def test_invalid_cutoff_is_rejected(app, orders):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            archive_orders('2021/01/01')
+        assert Order.query.count() == 4
+
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    class ReplicaConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp_path, 'erp.db')
+        SQLALCHEMY_BINDS = {'replica': 'sqlite:///' + os.path.join(tmp_path, 'replica.db')}
+        ARCHIVE_DIR = os.path.join(tmp_path, 'archive')
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # db es global: sin esto el resto de las pruebas esperaría el bind 'replica'
+    db.metadatas.pop('replica', None)
+
+
+def test_stats_skip_stale_replica_after_archiving(replica_app, tmp_path):
+    app = replica_app
+    with app.app_context():
+        db.session.add_all([
+            Order(client_id=1, seller_id=1, date='2020-01-15', total=100),
+            Order(client_id=1, seller_id=1, date='2030-05-01', total=400),
+        ])
+        db.session.commit()
+    client = app.test_client()
+    client.post('/register', json={'username': 'admin', 'email': 'admin@erp.com', 'password': 'clave'})
+    token = client.post('/login', json={'username': 'admin', 'password': 'clave'}).get_json()['token']
+    client.delete_cookie('last_write')
+
+    # La réplica queda con la copia previa al archivado, dentro del retraso tolerado
+    with sqlite3.connect(os.path.join(tmp_path, 'erp.db')) as source, \
+            sqlite3.connect(os.path.join(tmp_path, 'replica.db')) as target:
+        source.backup(target)
+    with app.app_context():
+        assert archive_orders('2021-01-01')['orders'] == 1
+
+    stats = client.get('/stats', headers={'Authorization': f'Bearer {token}'}).get_json()
+    assert (stats['total_orders'], stats['total_sales']) == (2, 500)
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Product, Log
+
+
+@pytest.fixture
+def products(app):
+    with app.app_context():
+        db.session.add_all([
+            Product(name='Martillo', price=10.0, stock=5, category='Herramientas'),
+            Product(name='Serrucho', price=20.0, stock=3, category='Herramientas'),
+            Product(name='Cable', price=1.0, stock=100, category='Electricidad'),
+        ])
+        db.session.commit()
+
+
+def bulk(client, headers, **payload):
+    return client.patch('/products/bulk', json=payload, headers=headers)
+
+
+def snapshot(app):
+    with app.app_context():
+        return {p.id: (p.price, p.stock) for p in Product.query.all()}
+
+
+def test_dry_run_reports_counts_without_writing(app, client, auth_headers, products):
+    before = snapshot(app)
+
+    data = bulk(client, auth_headers, operation='price_factor', factor=1.1,
+                category='Herramientas', dry_run=True).get_json()
+    assert data['affected'] == 2
+    assert [(p['id'], p['new_price']) for p in data['preview']] == [(1, 11.0), (2, 22.0)]
+
+    data = bulk(client, auth_headers, operation='price_list', dry_run=True,
+                items=[{'id': 3, 'price': 2.5}, {'id': 99, 'price': 1}]).get_json()
+    assert (data['affected'], data['missing']) == (1, [99])
+
+    assert snapshot(app) == before
+
+
+def test_price_factor_requires_filter_or_all(app, client, auth_headers, products):
+    response = bulk(client, auth_headers, operation='price_factor', factor=2)
+    assert response.status_code == 400
+    assert snapshot(app)[3] == (1.0, 100)
+
+    response = bulk(client, auth_headers, operation='price_factor', factor=2, all=True)
+    assert response.get_json()['affected'] == 3
+    assert [price for price, _ in snapshot(app).values()] == [20.0, 40.0, 2.0]
+
+
+@pytest.mark.parametrize('payload', [
+    {'operation': 'price_factor', 'factor': '1e400', 'ids': [2]},
+    {'operation': 'price_factor', 'factor': 1.1, 'ids': '5'},
+    {'operation': 'price_list', 'items': [{'id': 1, 'price': -5}]},
+    {'operation': 'price_list', 'items': [{'id': 1, 'price': 'inf'}]},
+    {'operation': 'price_list', 'items': [{'id': '1', 'price': 5}]},
+    {'operation': 'price_list', 'items': [{'id': True, 'price': 5}]},
+    {'operation': 'stock_adjust', 'items': [{'id': 1, 'delta': 2.9}]},
+    {'operation': 'stock_adjust', 'items': [{'id': 1, 'delta': 1}, {'id': 1, 'delta': 1}]},
+])
+def test_invalid_payloads_are_rejected(app, client, auth_headers, products, payload):
+    before = snapshot(app)
+    assert bulk(client, auth_headers, **payload).status_code == 400
+    assert snapshot(app) == before
+
+
+def test_negative_stock_rolls_back_everything(app, client, auth_headers, products):
+    response = bulk(client, auth_headers, operation='stock_adjust',
+                    items=[{'id': 1, 'delta': -2}, {'id': 2, 'delta': -4}])
+    assert response.status_code == 400
+    assert response.get_json()['negative_stock_ids'] == [2]
+    assert snapshot(app)[1] == (10.0, 5)
+
+
+def test_concurrent_sale_is_caught_by_update_guard(app, client, auth_headers, products):
+    # Simula una venta que llega entre la lectura del stock y el UPDATE
+    with app.app_context():
+        engine = db.engine
+
+    def sale(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE product SET stock'):
+            cursor.execute('UPDATE product SET stock = 0 WHERE id = 1')
+
+    event.listen(engine, 'before_cursor_execute', sale)
+    try:
+        response = bulk(client, auth_headers, operation='stock_adjust',
+                        items=[{'id': 1, 'delta': -2}, {'id': 3, 'delta': 5}])
+    finally:
+        event.remove(engine, 'before_cursor_execute', sale)
+
+    assert response.status_code == 409
+    # Se deshace todo, incluida la "venta" simulada en la misma transacción
+    assert snapshot(app) == {1: (10.0, 5), 2: (20.0, 3), 3: (1.0, 100)}
+
+
+def test_audit_log_records_parameters(app, client, auth_headers, products):
+    bulk(client, auth_headers, operation='price_factor', factor=1.5, category='Electricidad')
+    bulk(client, auth_headers, operation='stock_adjust', items=[{'id': 2, 'delta': 7}])
+
+    with app.app_context():
+        logs = [(log.action, json.loads(log.details)) for log in Log.query.order_by(Log.id)]
+    assert logs[0][0] == 'bulk_price_factor'
+    assert (logs[0][1]['factor'], logs[0][1]['category'], logs[0][1]['affected']) == (1.5, 'Electricidad', 1)
+    assert logs[1] == ('bulk_stock_adjust', {'affected': 1, 'missing': [], 'items': {'2': 7}})
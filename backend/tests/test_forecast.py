@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from app import db
+from app.forecast import get_velocity
+from app.models import Client, Seller, Product, Order, OrderDetail
+
+
+def test_cache_follows_changes_made_by_other_processes(app):
+    today = date.today().isoformat()
+    with app.app_context():
+        db.session.add_all([
+            Client(name='Cliente', email='cliente@erp.com'),
+            Seller(name='Vendedor', zone='Centro', email='vendedor@erp.com'),
+            Product(name='Martillo', price=10, stock=5),
+            Product(name='Serrucho', price=20, stock=5),
+            Order(client_id=1, seller_id=1, date=today, total=100),
+        ])
+        db.session.add(OrderDetail(order_id=1, product_id=1, quantity=4, unit_price=10))
+        db.session.commit()
+        assert get_velocity()['product_ids'].tolist() == [1]
+
+        # Ediciones directas en la base, sin pasar por las rutas de este proceso:
+        # ni la cantidad de filas ni el id máximo cambian
+        db.session.execute(db.update(OrderDetail).values(product_id=2))
+        db.session.commit()
+        assert get_velocity()['product_ids'].tolist() == [2]
+
+        old = (date.today() - timedelta(days=1000)).isoformat()
+        db.session.execute(db.update(Order).values(date=old))
+        db.session.commit()
+        assert get_velocity()['product_ids'].tolist() == []